@@ -22,7 +22,6 @@ REQUIRES = [
     "backoff",
     "cachecontrol",
     "cached_property",
-    "colorthief",
     "fire",
     "first",
     "gunicorn",
@@ -33,6 +32,7 @@ REQUIRES = [
     "msgpack",
     "oauthlib",
     "pandas",
+    "Pillow",
     "pony",
     "psycopg2-binary",
     "pycountry",
@@ -74,6 +74,7 @@ setup(
         "Programming Language :: Python :: Implementation :: PyPy",
     ],
     install_requires=REQUIRES,
+    extras_require={"uvloop": ["uvloop"], "orjson": ["orjson"]},
     tests_require=["pytest"],
     packages=find_packages(),
     package_data={"spfy": ["config/*.toml", "html/*.html"]},
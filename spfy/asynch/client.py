@@ -6,6 +6,7 @@ import aioredis
 import asyncpg
 import logging
 import msgpack
+import random
 import signal
 import ujson as json
 from aiohttp.client_exceptions import (
@@ -15,7 +16,6 @@ from aiohttp.client_exceptions import (
 )
 from datetime import datetime
 from first import first
-from functools import partialmethod
 from hashlib import sha1
 from itertools import chain
 from oauthlib.oauth2.rfc6749.errors import TokenExpiredError
@@ -29,13 +29,13 @@ from tenacity import (
 )
 
 from .. import config, logger
-from ..cache import AudioFeatures, Playlist, async_lru, db_session, select
+from ..cache import AudioFeatures, Playlist, async_lru, db_session, init_db, select
 from ..constants import (
     API,
     DEVICE_ID_RE,
     MANELISTI,
     PLAYLIST_URI_RE,
-    AudioFeature,
+    RECOMMENDATION_PARAMS,
     AuthFlow,
     TimeRange,
 )
@@ -83,6 +83,7 @@ class SpotifyClient(AuthMixin, EmailMixin):
         :param proxy: Definition of proxy
         :param requests_timeout: Tell Requests to stop waiting for a response after a given number of seconds
         """
+        init_db()
         super().__init__(*args, **kwargs)
         self.proxy = proxy
         self.requests_timeout = requests_timeout
@@ -460,7 +461,7 @@ class SpotifyClient(AuthMixin, EmailMixin):
             API.ARTIST_TOP_TRACKS.value.format(id=_id), country=country, **kwargs
         )
 
-    @async_lru(maxsize=128)
+    @async_lru(maxsize=128, ttl=60 * 60)
     async def artist_related_artists(self, artist_id, **kwargs):
         """Get Spotify catalog information about artists similar to an
         identified artist. Similarity is based on analysis of the
@@ -828,6 +829,9 @@ class SpotifyClient(AuthMixin, EmailMixin):
             - snapshot_id - optional id of the playlist snapshot
 
         """
+        if not tracks:
+            return None
+
         _id = self._get_playlist_id(playlist_id)
         track_uris = map(self._get_track_uri, tracks)
         payload = {"tracks": [{"uri": track} for track in track_uris]}
@@ -856,6 +860,9 @@ class SpotifyClient(AuthMixin, EmailMixin):
                     ]
             - snapshot_id - optional id of the playlist snapshot
         """
+        if not tracks:
+            return None
+
         _id = self._get_playlist_id(playlist_id)
         ftracks = []
         for tr in tracks:
@@ -957,8 +964,11 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - ids - a list of artist IDs
         """
+        if not ids:
+            return None
+
         return await self._put(
-            API.MY_FOLLOWING.value, type="artist", ids=",".join(ids or []), **kwargs
+            API.MY_FOLLOWING.value, type="artist", ids=",".join(ids), **kwargs
         )
 
     async def user_follow_users(self, ids=None, **kwargs):
@@ -966,8 +976,11 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - ids - a list of user IDs
         """
+        if not ids:
+            return None
+
         return await self._put(
-            API.MY_FOLLOWING.value, type="user", ids=",".join(ids or []), **kwargs
+            API.MY_FOLLOWING.value, type="user", ids=",".join(ids), **kwargs
         )
 
     async def current_user_saved_tracks_delete(self, tracks=None, **kwargs):
@@ -977,9 +990,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - tracks - a list of track URIs, URLs or IDs
         """
-        track_list = []
-        if tracks is not None:
-            track_list = map(self._get_track_id, tracks)
+        if not tracks:
+            return None
+
+        track_list = map(self._get_track_id, tracks)
         return await self._delete(
             API.MY_TRACKS.value, ids=",".join(track_list), **kwargs
         )
@@ -991,9 +1005,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - tracks - a list of track URIs, URLs or IDs
         """
-        track_list = []
-        if tracks is not None:
-            track_list = map(self._get_track_id, tracks)
+        if not tracks:
+            return []
+
+        track_list = map(self._get_track_id, tracks)
         return await self._get(
             API.MY_TRACKS_CONTAINS.value, ",".join(track_list), **kwargs
         )
@@ -1005,9 +1020,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - tracks - a list of track URIs, URLs or IDs
         """
-        track_list = []
-        if tracks is not None:
-            track_list = map(self._get_track_id, tracks)
+        if not tracks:
+            return None
+
+        track_list = map(self._get_track_id, tracks)
         return await self._put(API.MY_TRACKS.value, ids=",".join(track_list), **kwargs)
 
     async def current_user_top_artists(
@@ -1056,7 +1072,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - albums - a list of album URIs, URLs or IDs
         """
-        album_list = map(self._get_album_id, albums or [])
+        if not albums:
+            return None
+
+        album_list = map(self._get_album_id, albums)
         return await self._put(API.MY_ALBUMS.value, ids=",".join(album_list), **kwargs)
 
     async def featured_playlists(
@@ -1204,11 +1223,8 @@ class SpotifyClient(AuthMixin, EmailMixin):
             params["seed_tracks"] = ",".join(map(self._get_track_id, seed_tracks))
         if country:
             params["market"] = country
-        for attribute in list(AudioFeature):
-            for prefix in ["min_", "max_", "target_"]:
-                param = prefix + attribute.value
-                if param in kwargs:
-                    params[param] = kwargs.pop(param)
+        for param in RECOMMENDATION_PARAMS & kwargs.keys():
+            params[param] = kwargs.pop(param)
 
         if not filter_manele:
             return await self._get(API.RECOMMENDATIONS.value, **params, **kwargs)
@@ -1278,12 +1294,24 @@ class SpotifyClient(AuthMixin, EmailMixin):
                 tracks = list(set(tracks) - {a.id for a in cached_tracks})
 
         batches = [tracks[i : i + 100] for i in range(0, len(tracks), 100)]
+        semaphore = asyncio.Semaphore(config.http.parallel_connections or 20)
+
+        async def fetch_batch(batch):
+            async with semaphore:
+                return await self._get(
+                    API.AUDIO_FEATURES_MULTIPLE.value, ids=",".join(batch), **kwargs
+                )
+
         audio_features = await asyncio.gather(
-            *[
-                self._get(API.AUDIO_FEATURES_MULTIPLE.value, ids=",".join(t), **kwargs)
-                for t in batches
-            ]
+            *map(fetch_batch, batches), return_exceptions=True
         )
+        failed = [i for i, r in enumerate(audio_features) if isinstance(r, Exception)]
+        if failed:
+            logger.warning("Retrying %d failed audio features batches", len(failed))
+            await asyncio.sleep(random.uniform(1, 2))
+            retried = await asyncio.gather(*(fetch_batch(batches[i]) for i in failed))
+            for i, result in zip(failed, retried):
+                audio_features[i] = result
 
         if not with_cache:
             audio_features = list(chain.from_iterable(audio_features))
@@ -1293,15 +1321,13 @@ class SpotifyClient(AuthMixin, EmailMixin):
                     :
                 ]
                 new_cached_track_ids = {a.id for a in new_cached_tracks}
-                audio_features = (
-                    [
-                        AudioFeatures.from_dict(t)
-                        for t in chain.from_iterable(audio_features)
-                        if t["id"] not in new_cached_track_ids
-                    ]
-                    + cached_tracks
-                    + new_cached_tracks
+                audio_features = AudioFeatures.from_dict_many(
+                    t
+                    for t in chain.from_iterable(audio_features)
+                    if t and t["id"] not in new_cached_track_ids
                 )
+                audio_features.extend(cached_tracks)
+                audio_features.extend(new_cached_tracks)
         if dicts:
             return [a.to_dict(convert_key=True) for a in audio_features]
         return audio_features
@@ -1314,6 +1340,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         if isinstance(device, (str, bytes)) and DEVICE_ID_RE.match(device):
             return device
 
+        device_id = getattr(device, "id", None)
+        if isinstance(device_id, str) and DEVICE_ID_RE.match(device_id):
+            return device_id
+
         device = await self.get_device(device)
         return device.id
 
@@ -1498,15 +1528,16 @@ class SpotifyClient(AuthMixin, EmailMixin):
             - volume_percent - volume between 0 and 100
             - device - device target for playback
         """
-        device = await self.get_device(device)
         if volume_percent is None:
+            device = await self.get_device(device)
             return device.volume_percent
 
         assert 0 <= volume_percent <= 100
+        device_id = await self.get_device_id(device)
         await self._put(
             API.VOLUME.value,
             volume_percent=volume_percent,
-            device_id=device.id,
+            device_id=device_id,
             check_202=True,
             **kwargs,
         )
@@ -1561,16 +1592,23 @@ class SpotifyClient(AuthMixin, EmailMixin):
 
         return result
 
-    _get_track_id = partialmethod(_get_id, "track")
-    _get_artist_id = partialmethod(_get_id, "artist")
-    _get_album_id = partialmethod(_get_id, "album")
-    _get_playlist_id = partialmethod(_get_id, "playlist")
+    def _get_track_id(self, result):
+        return self._get_id("track", result)
+
+    def _get_artist_id(self, result):
+        return self._get_id("artist", result)
+
+    def _get_album_id(self, result):
+        return self._get_id("album", result)
+
+    def _get_playlist_id(self, result):
+        return self._get_id("playlist", result)
 
     def _get_uri(self, _type, result):
         if isinstance(result, str) and result.startswith("spotify:"):
             return result
 
-        return "spotify:" + _type + ":" + self._get_id(_type, result)
+        return f"spotify:{_type}:{self._get_id(_type, result)}"
 
     def _get_playlist_uri(self, playlist, user=None):
         if isinstance(playlist, (str, bytes)) and PLAYLIST_URI_RE.match(playlist):
@@ -1591,6 +1629,11 @@ class SpotifyClient(AuthMixin, EmailMixin):
 
         return None
 
-    _get_track_uri = partialmethod(_get_uri, "track")
-    _get_artist_uri = partialmethod(_get_uri, "artist")
-    _get_album_uri = partialmethod(_get_uri, "album")
+    def _get_track_uri(self, result):
+        return self._get_uri("track", result)
+
+    def _get_artist_uri(self, result):
+        return self._get_uri("artist", result)
+
+    def _get_album_uri(self, result):
+        return self._get_uri("album", result)
@@ -1,11 +1,30 @@
 #!/usr/bin/env python3
+import asyncio
+
+import ast
 import fire
+import inspect
+import sys
+from fire.core import _PrintResult
+from fire.trace import FireTrace
+from functools import lru_cache
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
 
 from .. import config, logger
+from ..cache import close_http_session, db_session
 from ..constants import AuthFlow
 from ..mixins.asynch import PlayerMixin, RecommenderMixin
+from ..mixins.asynch.auth import close_connector
 from .client import SpotifyClient
 
+_DEFAULT_EMAIL = config.auth.email
+_DEFAULT_USERNAME = config.auth.username
+
+
 # pylint: disable=too-many-ancestors
 
 
@@ -13,53 +32,186 @@ class Spotify(SpotifyClient, PlayerMixin, RecommenderMixin):
     """Spotify high-level wrapper."""
 
     cli = False
-    loop = None
 
     def __init__(self, *args, email=None, username=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.email = email or config.auth.email
-        self.username = username or config.auth.username
+        self.email = email or _DEFAULT_EMAIL
+        self.username = username or _DEFAULT_USERNAME
 
     def __dir__(self):
-        names = super().__dir__()
-        names = [name for name in names if not name.startswith("_") and name != "user"]
-        return names
+        cls = type(self)
+        if "_public_names" not in vars(cls):
+            # fire calls dir() repeatedly while introspecting the CLI and the
+            # names coming from the class hierarchy never change
+            cls._public_names = tuple(
+                name for name in dir(cls) if not name.startswith("_") and name != "user"
+            )
+        instance_names = (
+            name for name in vars(self) if not name.startswith("_") and name != "user"
+        )
+        return list(dict.fromkeys([*cls._public_names, *instance_names]))
 
-    async def auth(
-        self, email=config.auth.email, username=config.auth.username, server=False
-    ):
+    async def auth(self, email=None, username=None, server=False):
         if self.cli and not self.is_authenticated:
             if server:
                 await self.authenticate(flow=AuthFlow.CLIENT_CREDENTIALS)
             else:
                 try:
-                    await self.authenticate(email=email, username=username)
+                    await self.authenticate(
+                        email=email or _DEFAULT_EMAIL,
+                        username=username or _DEFAULT_USERNAME,
+                    )
                 except Exception as exc:
                     logger.exception(exc)
         return self
 
 
-def main():
-    """Main function."""
+# Flags only fire knows how to handle (help, tracing, interactive mode...)
+FIRE_FLAGS = {"-h", "--help", "--", "--interactive", "--trace", "--completion"}
+
+
+@lru_cache(maxsize=None)
+def cli_commands():
+    """Public methods that can be dispatched without going through fire.
+
+    Every public method is a command, like under fire, so this is derived from
+    the class once instead of kept in a separate registry.
+    """
+    return frozenset(
+        name
+        for name in dir(Spotify)
+        if not name.startswith("_")
+        and name != "user"
+        and callable(getattr(Spotify, name))
+    )
 
-    import asyncio
 
+def parse_value(value):
     try:
-        import uvloop
+        return ast.literal_eval(value)
+    except (ValueError, SyntaxError):
+        return value
 
-        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
-    except ImportError:
-        pass
+
+def parse_commands(argv):
+    """Split a fire style command line into (name, args, kwargs) calls.
+
+    Calls are chained with a lone `-`, e.g. `- auth --server - devices`.
+    """
+    commands = [[None, [], {}]]
+    i = 0
+    while i < len(argv):
+        arg = argv[i]
+        i += 1
+        command = commands[-1]
+        if arg == "-":
+            commands.append([None, [], {}])
+        elif command[0] is None:
+            command[0] = arg.replace("-", "_")
+        elif arg.startswith("--"):
+            name, sep, value = arg[2:].partition("=")
+            if not sep:
+                # A bare `--flag` is True unless a value follows it
+                if i < len(argv) and argv[i] != "-" and not argv[i].startswith("--"):
+                    value = argv[i]
+                    i += 1
+                else:
+                    value = "True"
+            command[2][name.replace("-", "_")] = parse_value(value)
+        else:
+            command[1].append(parse_value(arg))
+    return [tuple(command) for command in commands if command[0] is not None]
+
+
+def negate_flags(func, kwargs):
+    """Turn bare `--noflag` arguments into `flag=False` like fire does.
+
+    Only applies when `func` takes `flag` but has no `noflag` argument itself.
+    """
+    try:
+        params = inspect.signature(func).parameters
+    except (TypeError, ValueError):
+        return kwargs
+
+    resolved = {}
+    for name, value in kwargs.items():
+        if (
+            value is True
+            and name.startswith("no")
+            and name not in params
+            and name[2:] in params
+        ):
+            resolved[name[2:]] = False
+        else:
+            resolved[name] = value
+    return resolved
+
+
+def print_result(result):
+    """Print a command's result with fire's output formatting."""
+    _PrintResult(FireTrace(result))
+
+
+async def run_commands(commands):
+    spotify = Spotify()
+    try:
+        result = spotify
+        for name, args, kwargs in commands:
+            func = getattr(result, name)
+            result = func(*args, **negate_flags(func, kwargs))
+            if inspect.isawaitable(result):
+                result = await result
+        return None if result is spotify else result
+    finally:
+        if spotify.session and not spotify.session.closed:
+            await spotify.session.close()
+        await close_connector()
+        await close_http_session()
+
+
+def fire_main():
+    # fire drives coroutine commands through asyncio.get_event_loop() so it
+    # can't run under asyncio.run(); the loop is owned by this invocation only
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    spotify = None
     try:
-        Spotify.cli = True
-        Spotify.loop = asyncio.get_event_loop()
         spotify = Spotify()
         fire.Fire(spotify)
+    finally:
+        if spotify and spotify.session and not spotify.session.closed:
+            loop.run_until_complete(spotify.session.close())
+        loop.run_until_complete(close_connector())
+        loop.run_until_complete(close_http_session())
+        loop.close()
+
+
+def main():
+    """Main function."""
+    if uvloop:
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    Spotify.cli = True
+    argv = sys.argv[1:]
+    try:
+        commands = parse_commands(argv)
+        if (
+            not commands
+            or FIRE_FLAGS.intersection(argv)
+            or commands[0][0] not in cli_commands()
+        ):
+            fire_main()
+            return
+
+        # Commands can return lazy Pony collections that are only loaded
+        # when the result gets printed
+        with db_session:
+            result = asyncio.run(run_commands(commands))
+            if result is not None:
+                print_result(result)
     except KeyboardInterrupt:
         print("Quitting")
-    finally:
-        if spotify.session and not Spotify.loop.is_running():
-            Spotify.loop.run_until_complete(spotify.session.close())
 
 
 if __name__ == "__main__":
@@ -3,18 +3,22 @@ import asyncio
 from enum import IntEnum
 
 import aiohttp
+import numpy as np
 import os
 import psycopg2.extras
 import random
 import re
 import requests
 import string
+import sys
 import time
-from collections import OrderedDict
-from colorthief import ColorThief
+from cached_property import cached_property
+from collections import OrderedDict, defaultdict
 from datetime import date, datetime
 from first import first
+from functools import lru_cache
 from io import BytesIO
+from PIL import Image as PILImage
 from pony.orm import (
     Database,
     Json,
@@ -33,20 +37,90 @@ from pony.orm.core import CacheIndexError
 from psycopg2.extensions import register_adapter
 from pycountry import countries
 from unsplash.errors import UnsplashConnectionError, UnsplashError
-from uuid import NAMESPACE_URL, UUID, uuid4, uuid5
+from uuid import UUID, uuid4
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 from .. import Unsplash, config, logger
 from ..constants import TimeRange
 from ..sql import SQL, SQL_DEFAULT
+from .lru import async_lru
+
+
+class OrjsonAdapter(psycopg2.extras.Json):
+    def dumps(self, obj):
+        return orjson.dumps(obj).decode()
+
+
+register_adapter(
+    ormtypes.TrackedDict, OrjsonAdapter if orjson else psycopg2.extras.Json
+)
 
-DIGITS_PATTERN = re.compile(r"[0-9]")
-register_adapter(ormtypes.TrackedDict, psycopg2.extras.Json)
 if os.getenv("SQL_DEBUG"):
     sql_debug(True)
     import logging
 
     logging.getLogger("pony.orm.sql").setLevel(logging.DEBUG)
 db = Database()
+IMAGE_COLUMN_TYPES = {
+    "url": "text",
+    "width": "int",
+    "height": "int",
+    "color": "text",
+    "unsplash_id": "text",
+    "unsplash_user_fullname": "text",
+    "unsplash_user_username": "text",
+    "playlist": "text",
+    "artist": "text",
+    "genre": "text",
+    "country": "text",
+    "city": "text",
+    "user": "uuid",
+}
+http_session = None
+# aiohttp sessions are bound to the loop they were created on
+http_session_loop = None
+requests_session = None
+DOMINANT_PALETTE_SIZE = 5
+# Pillow >= 9.1 moved the quantize methods into an enum
+QUANTIZE_FASTOCTREE = getattr(PILImage, "Quantize", PILImage).FASTOCTREE
+
+
+async def get_http_session():
+    """Session shared by the image downloads so their connections get reused."""
+    global http_session, http_session_loop  # pylint: disable=global-statement
+    loop = asyncio.get_running_loop()
+    if http_session is None or http_session.closed or http_session_loop is not loop:
+        http_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=100, limit_per_host=20, keepalive_timeout=300, ttl_dns_cache=300
+            )
+        )
+        http_session_loop = loop
+    return http_session
+
+
+async def close_http_session():
+    if (
+        http_session is not None
+        and not http_session.closed
+        and http_session_loop is asyncio.get_running_loop()
+    ):
+        await http_session.close()
+
+
+def get_requests_session():
+    """Blocking counterpart of `get_http_session` for the sync image helpers."""
+    global requests_session  # pylint: disable=global-statement
+    if requests_session is None:
+        requests_session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=20, pool_maxsize=100)
+        requests_session.mount("http://", adapter)
+        requests_session.mount("https://", adapter)
+    return requests_session
 
 
 def create_condition(op="AND", firstsub=1, **fields):
@@ -56,41 +130,142 @@ def create_condition(op="AND", firstsub=1, **fields):
     return condition
 
 
+@lru_cache(maxsize=None)
+def iso_country_index():
+    """Lowercase lookup tables over pycountry, built on first use.
+
+    Returns the countries by code, by name (with official and common names as
+    fallbacks) and the (name, official name) pairs used for substring search.
+    """
+    by_code = {"uk": countries.get(alpha_2="GB")}
+    by_name = {"usa": countries.get(alpha_2="US")}
+    for attr in ("name", "official_name", "common_name"):
+        for country in countries:
+            country_name = getattr(country, attr, None)
+            if country_name:
+                by_name.setdefault(country_name.lower(), country)
+    for country in countries:
+        by_code.setdefault(country.alpha_2.lower(), country)
+
+    searchable_names = [
+        (
+            (country.name.lower(), getattr(country, "official_name", "").lower()),
+            country,
+        )
+        for country in countries
+    ]
+    return by_code, by_name, searchable_names
+
+
+@lru_cache(maxsize=32)
+def time_range_value(time_range):
+    return TimeRange(time_range).value
+
+
+def parse_date(value):
+    """Parse a `YYYYMMDD` or `YYYY-MM-DD` date without going through strptime."""
+    if len(value) == 8:
+        return date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+    return date(int(value[:4]), int(value[5:7]), int(value[8:10]))
+
+
+def quote_param(param):
+    tag = "".join(random.sample(string.ascii_letters, 3))
+    return f"${tag}${param}${tag}$"
+
+
+PARAM_FORMATTERS = {
+    int: str,
+    float: str,
+    bool: str,
+    type(None): lambda param: "null",
+    str: quote_param,
+    bytes: quote_param,
+    dict: quote_param,
+    date: quote_param,
+    datetime: quote_param,
+    UUID: quote_param,
+}
+
+
 def format_param(param):
+    formatter = PARAM_FORMATTERS.get(type(param))
+    if formatter is not None:
+        return formatter(param)
+
+    # Subclasses (e.g. API result dicts) fall back to the isinstance checks
     if isinstance(param, (int, float, bool)):
         return str(param)
     if isinstance(param, (str, bytes, dict, date, datetime, UUID)):
-        tag = "".join(random.sample(string.ascii_letters, 3))
-        return f"${tag}${param}${tag}$"
-    if param is None:
-        return "null"
+        return quote_param(param)
     return param
 
 
+@lru_cache(maxsize=64)
+def image_query(fields, min_dimension=None):
+    """SELECT for the image best fitting `min_dimension` (width or height).
+
+    The field values are bound after the dimension when there is one, otherwise
+    they start at `$1`.
+    """
+    if min_dimension:
+        condition = create_condition(firstsub=2, **dict.fromkeys(fields))
+        return (
+            f"SELECT * FROM images WHERE {min_dimension} >= $1 AND {condition} "
+            f"ORDER BY {min_dimension} LIMIT 1"
+        )
+
+    condition = create_condition(**dict.fromkeys(fields))
+    return f"SELECT * FROM images WHERE {condition} ORDER BY width DESC LIMIT 1"
+
+
+@lru_cache(maxsize=1024)
+def image_queries(key):
+    """Unsplash search terms for `key`: itself, its words and their stems."""
+    words = key.split()
+    stems = [w[:i] for w in words for i in range(len(w) - 1, 2, -1)]
+    return tuple(dict.fromkeys([key, *words, *stems]))
+
+
 class ImageMixin:
     @classmethod
     async def image_pg(cls, conn, width=None, height=None, **fields):
-        condition = create_condition(firstsub=2, **fields)
         if width:
-            image = await conn.fetchrow(
-                f"SELECT * FROM images WHERE width >= $1 AND {condition} ORDER BY width LIMIT 1",
-                width,
-                *fields.values(),
-            )
-        elif height:
-            image = await conn.fetchrow(
-                f"SELECT * FROM images WHERE height >= $1 AND {condition} ORDER BY height LIMIT 1",
-                height,
-                *fields.values(),
+            query = image_query(tuple(fields.keys()), "width")
+            return await conn.fetchrow(query, width, *fields.values())
+        if height:
+            query = image_query(tuple(fields.keys()), "height")
+            return await conn.fetchrow(query, height, *fields.values())
+
+        query = image_query(tuple(fields.keys()))
+        return await conn.fetchrow(query, *fields.values())
+
+    @classmethod
+    async def best_images_pg(cls, conn, keys, width=None, height=None):
+        """`image_pg` for many entities of this class in one query, keyed by id."""
+        owner = cls.__name__.lower()
+        condition = f'"{owner}" = ANY($1::{IMAGE_COLUMN_TYPES[owner]}[])'
+        if width or height:
+            dimension = "width" if width else "height"
+            rows = await conn.fetch(
+                f'SELECT DISTINCT ON ("{owner}") * FROM images '
+                f"WHERE {condition} AND {dimension} >= $2 "
+                f'ORDER BY "{owner}", {dimension}',
+                list(keys),
+                width or height,
             )
         else:
-            image = await conn.fetchrow(
-                f"SELECT * FROM images WHERE {condition} ORDER BY width DESC LIMIT 1",
-                *fields.values(),
+            rows = await conn.fetch(
+                f'SELECT DISTINCT ON ("{owner}") * FROM images WHERE {condition} '
+                f'ORDER BY "{owner}", width DESC',
+                list(keys),
             )
-        return image
+        return {row[owner]: row for row in rows}
 
     def image(self, width=None, height=None):
+        if self.images_loaded():
+            return self.pick_image(list(self.images), width, height)
+
         if width:
             image = (
                 self.images.select()
@@ -109,18 +284,48 @@ class ImageMixin:
             image = self.images.select().order_by(desc(Image.width)).first()
         return image
 
+    def images_loaded(self):
+        """Whether the `images` collection was already fully read in this session."""
+        setdata = getattr(self, "_vals_", {}).get(type(self).images)
+        return bool(getattr(setdata, "is_fully_loaded", False))
+
+    @staticmethod
+    def pick_image(images, width=None, height=None):
+        """In-memory equivalent of `image()` over a list of Image entities."""
+        if width:
+            return min(
+                (i for i in images if (i.width or 0) >= width),
+                key=lambda i: i.width,
+                default=None,
+            )
+        if height:
+            return min(
+                (i for i in images if (i.height or 0) >= height),
+                key=lambda i: i.height,
+                default=None,
+            )
+        return max(images, key=lambda i: i.width or 0, default=None)
+
+    @classmethod
+    def best_images(cls, entities, width=None, height=None):
+        """Pick `image(width, height)` for many entities with a single query.
+
+        Returns a dict mapping each entity to its image, or to None if it has none.
+        """
+        entities = list(entities)
+        owner = cls.__name__.lower()
+        images = defaultdict(list)
+        for image in select(i for i in Image if getattr(i, owner) in entities):
+            images[getattr(image, owner)].append(image)
+        return {e: cls.pick_image(images[e], width, height) for e in entities}
+
     @classmethod
     def get_image_queries_pg(cls, key):
-        words = key.split()
-        stems = [[w[:i] for i in range(len(w), 2, -1)] for w in words]
-        queries = [key, *words, *sum(stems, [])]
-        return queries + [f"{query} music" for query in queries]
+        queries = image_queries(key)
+        return [*queries, *(f"{query} music" for query in queries)]
 
     def get_image_queries(self):
-        words = self.name.split()
-        stems = [[w[:i] for i in range(len(w), 2, -1)] for w in words]
-        queries = [*words, self.name, *sum(stems, [])]
-        return [f"{query} music" for query in queries]
+        return [f"{query} music" for query in image_queries(self.name)]
 
     @classmethod
     async def get_image_fields(cls, image_key=None, **fields):
@@ -133,6 +338,10 @@ class ImageMixin:
         if photo is None:
             return None
 
+        return cls.get_photo_image_fields(photo, **fields), fields
+
+    @staticmethod
+    def get_photo_image_fields(photo, **fields):
         ratio = photo.height / photo.width
         params = {
             "color": photo.color,
@@ -141,7 +350,7 @@ class ImageMixin:
             "unsplash_user_username": photo.user.username,
             **fields,
         }
-        image_fields = [
+        return [
             {
                 **params,
                 "url": photo.urls.full,
@@ -167,11 +376,6 @@ class ImageMixin:
                 "height": int(round(ratio * Image.THUMB)),
             },
         ]
-        image_fields = [
-            OrderedDict(sorted(d.items(), key=lambda t: t[0])) for d in image_fields
-        ]
-
-        return image_fields, fields
 
     @classmethod
     async def upsert_unsplash_image(cls, conn, image_fields, **updated_fields):
@@ -179,22 +383,43 @@ class ImageMixin:
             "Upserting image: %s | UPDATED: [%s]", image_fields, updated_fields
         )
 
-        columns = ", ".join(image_fields[0].keys())
-        values = ",\n".join(
-            f"({', '.join([format_param(p) for p in im.values()])})"
-            for im in image_fields
-        )
-        updated_fields_str = ", ".join(
-            f"{col} = ${i+1}" for i, col in enumerate(updated_fields.keys())
-        )
-        images = await conn.fetch(
-            f"""INSERT INTO images AS im ({columns})
-            VALUES {values}
-            ON CONFLICT (url) DO UPDATE SET {updated_fields_str}
-            RETURNING *
-            """,
-            *updated_fields.values(),
-        )
+        return await cls.upsert_unsplash_images(conn, [(image_fields, updated_fields)])
+
+    @classmethod
+    async def upsert_unsplash_images(cls, conn, results):
+        """Upsert the images of many `get_image_fields` results at once.
+
+        Rows are sent as one array per column and expanded with unnest, so each
+        group of rows sharing the same columns is a single statement.
+        """
+        groups = defaultdict(dict)
+        for image_fields, updated_fields in results:
+            columns = (tuple(image_fields[0].keys()), tuple(updated_fields.keys()))
+            for image in image_fields:
+                # ON CONFLICT can't update the same row twice in one statement
+                groups[columns][image["url"]] = image
+
+        images = []
+        for (columns, updated_columns), rows in groups.items():
+            arrays = ", ".join(
+                f"${i + 1}::{IMAGE_COLUMN_TYPES[col]}[]"
+                for i, col in enumerate(columns)
+            )
+            if updated_columns:
+                updated_fields_str = ", ".join(
+                    f"{col} = EXCLUDED.{col}" for col in updated_columns
+                )
+                conflict_action = f"DO UPDATE SET {updated_fields_str}"
+            else:
+                conflict_action = "DO NOTHING"
+            images += await conn.fetch(
+                f"""INSERT INTO images AS im ({', '.join(columns)})
+                SELECT * FROM unnest({arrays})
+                ON CONFLICT (url) {conflict_action}
+                RETURNING *
+                """,
+                *([row[col] for row in rows.values()] for col in columns),
+            )
         return [dict(i) for i in images]
 
     @classmethod
@@ -210,7 +435,8 @@ class ImageMixin:
 
     @staticmethod
     def get_optimal_image(images, width=None, height=None):
-        images = sorted(images, key=lambda i: i.get("width" or 0))
+        if len(images) > 1:
+            images = sorted(images, key=lambda i: i.get("width") or 0)
         if width:
             return first(
                 images, key=lambda i: (i.get("width") or 0) >= width, default=images[0]
@@ -224,28 +450,32 @@ class ImageMixin:
         return images[0]
 
     @staticmethod
-    async def get_unsplash_photo(queries):
-        photo = None
-        for query in queries:
-            try:
-                photos = await Unsplash.photo.random(
-                    query=query, orientation="squarish"
-                )
-            except (UnsplashError, UnsplashConnectionError):
-                continue
-
-            if photos:
-                photo = photos[0]
-                break
+    @async_lru(maxsize=1024, ttl=60)
+    async def get_random_unsplash_photo(query):
+        try:
+            photos = await Unsplash.photo.random(query=query, orientation="squarish")
+        except (UnsplashError, UnsplashConnectionError):
+            return None
+        return photos[0] if photos else None
 
-        else:
+    @classmethod
+    async def get_unsplash_photo(cls, queries, batch_size=4):
+        # Try a few queries at a time and keep whichever finds a photo first
+        for i in range(0, len(queries), batch_size):
+            tasks = [
+                asyncio.ensure_future(cls.get_random_unsplash_photo(query))
+                for query in queries[i : i + batch_size]
+            ]
             try:
-                photo = (
-                    await Unsplash.photo.random(query="music", orientation="squarish")
-                )[0]
-            except (UnsplashError, UnsplashConnectionError):
-                photo = None
-        return photo
+                for task in asyncio.as_completed(tasks):
+                    photo = await task
+                    if photo:
+                        return photo
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+        return await cls.get_random_unsplash_photo("music")
 
     async def fetch_unsplash_image(self, width=None, height=None):
         image = self.image(width, height)
@@ -257,63 +487,30 @@ class ImageMixin:
         if photo is None:
             return None
 
-        images = select(i for i in Image if i.unsplash_id == photo.id).for_update()
-        if images.exists():
-            params = {self.__class__.__name__.lower(): self}
-            for image in images:
-                image.set(**params)
-            return self.image(width, height)
-
+        # A single lookup covers both the rows already tagged with this photo
+        # and the ones stored under its URLs before it had an unsplash_id
         params = {self.__class__.__name__.lower(): self, "unsplash_id": photo.id}
-        image_exists = False
-        for url in (
-            photo.urls.full,
-            photo.urls.regular,
-            photo.urls.small,
-            photo.urls.thumb,
-        ):
-            image = Image.get(url=url)
-            if image:
-                image_exists = True
-                image.set(**params)
-        if image_exists:
-            return self.image(width, height)
-
-        ratio = photo.height / photo.width
-        params = {
-            self.__class__.__name__.lower(): self,
-            "color": photo.color,
-            "unsplash_id": photo.id,
-            "unsplash_user_fullname": photo.user.name,
-            "unsplash_user_username": photo.user.username,
-        }
-        Image(url=photo.urls.full, width=photo.width, height=photo.height, **params)
-        Image(
-            url=photo.urls.regular,
-            width=Image.REGULAR,
-            height=int(round(ratio * Image.REGULAR)),
-            **params,
-        )
-        Image(
-            url=photo.urls.small,
-            width=Image.SMALL,
-            height=int(round(ratio * Image.SMALL)),
-            **params,
+        urls = [photo.urls.full, photo.urls.regular, photo.urls.small, photo.urls.thumb]
+        images = list(
+            select(i for i in Image if i.unsplash_id == photo.id or i.url in urls)
         )
-        Image(
-            url=photo.urls.thumb,
-            width=Image.THUMB,
-            height=int(round(ratio * Image.THUMB)),
-            **params,
-        )
-        return self.image(width, height)
+        for image in images:
+            image.set(**params)
+        if not images:
+            image_fields = self.get_photo_image_fields(
+                photo, **{self.__class__.__name__.lower(): self}
+            )
+            images = [Image(**fields) for fields in image_fields]
+        # Pick from the rows at hand instead of querying them back with self.image()
+        return self.pick_image(images, width, height)
 
 
 class User(db.Entity, ImageMixin):
     _table_ = "users"
     DEFAULT_EMAIL = "spfy@backend"
     DEFAULT_USERNAME = "spfy-backend"
-    DEFAULT_USERID = uuid5(NAMESPACE_URL, DEFAULT_USERNAME)
+    # uuid5(NAMESPACE_URL, DEFAULT_USERNAME)
+    DEFAULT_USERID = UUID("8dc13c55-ca32-5cab-a9cd-2dd5a2d84b28")
     id = PrimaryKey(
         UUID, default=uuid4, sql_default=SQL_DEFAULT.uuid4
     )  # pylint: disable=redefined-builtin
@@ -355,7 +552,9 @@ class User(db.Entity, ImageMixin):
     async def from_dict_async(cls, user):
         if user.images:
             try:
-                color = await Image.grab_color_async(user.images[-1].url)
+                color = await asyncio.wait_for(
+                    Image.grab_color_async(user.images[-1].url), Image.COLOR_TIMEOUT
+                )
             except:
                 color = "#000000"
             for image in user.images:
@@ -371,7 +570,7 @@ class User(db.Entity, ImageMixin):
                 color = "#000000"
             for image in user.images:
                 image.color = color
-        images = [Image.get(url=image.url) or Image(**image) for image in user.images]
+        images = Image.from_dicts(user.images)
         spotify_user = SpotifyUser.get(id=user.id) or SpotifyUser(
             id=user.id, name=user.get("display_name") or ""
         )
@@ -385,9 +584,7 @@ class User(db.Entity, ImageMixin):
             country=Country.from_str(user.country),
             images=images,
             display_name=user.display_name or "",
-            birthdate=datetime.strptime(user.birthdate, "%Y-%m-%d")
-            if user.birthdate
-            else None,
+            birthdate=parse_date(user.birthdate) if user.birthdate else None,
         )
 
     async def _fetch_artist(self, artist, client):
@@ -474,24 +671,51 @@ class User(db.Entity, ImageMixin):
         for key, value in kwargs.items():
             await conn.execute(SQL.like.format(key), user_id, value)
 
+    @classmethod
+    async def like_pg_pool(cls, pool, user_id, **kwargs):
+        """Concurrent `like_pg`, running each statement on its own connection."""
+
+        async def like(key, value):
+            async with pool.acquire() as conn:
+                await conn.execute(SQL.like.format(key), user_id, value)
+
+        await asyncio.gather(*(like(key, value) for key, value in kwargs.items()))
+
     @classmethod
     async def dislike_pg(cls, conn, spotify, **kwargs):
         artist = kwargs.pop("artist", None)
         if artist:
-            artist = await spotify.artist(artist)
-            await conn.execute(
-                SQL.dislike_artist.format("artist"),
-                spotify.user_id,
-                artist.id,
-                artist.name,
-                artist.followers.total or 0,
-                artist.popularity or 0,
-            )
+            await cls.dislike_artist_pg(conn, spotify, artist)
         for key, value in kwargs.items():
             await conn.execute(SQL.dislike.format(key), spotify.user_id, value)
 
+    @classmethod
+    async def dislike_pg_pool(cls, pool, spotify, **kwargs):
+        """Concurrent `dislike_pg`, running each statement on its own connection."""
+
+        async def dislike(key, value):
+            async with pool.acquire() as conn:
+                if key == "artist":
+                    await cls.dislike_artist_pg(conn, spotify, value)
+                else:
+                    await conn.execute(SQL.dislike.format(key), spotify.user_id, value)
+
+        await asyncio.gather(*(dislike(key, value) for key, value in kwargs.items()))
+
+    @staticmethod
+    async def dislike_artist_pg(conn, spotify, artist):
+        artist = await spotify.artist(artist)
+        await conn.execute(
+            SQL.dislike_artist.format("artist"),
+            spotify.user_id,
+            artist.id,
+            artist.name,
+            artist.followers.total or 0,
+            artist.popularity or 0,
+        )
+
     def top_expired(self, time_range):
-        time_range = TimeRange(time_range).value
+        time_range = time_range_value(time_range)
         return (
             not self.top_expires_at
             or time_range not in self.top_expires_at
@@ -527,6 +751,7 @@ class Image(db.Entity):
     REGULAR = 1080
     SMALL = 400
     THUMB = 200
+    COLOR_TIMEOUT = 5
     url = PrimaryKey(str)
     height = Optional(int)
     width = Optional(int)
@@ -544,13 +769,21 @@ class Image(db.Entity):
     # pylint: disable=no-self-use
 
     @classmethod
+    @lru_cache(maxsize=1)
     def unsplash_url(cls):
         return f"https://unsplash.com/?utm_source={config.unsplash.app_name}&utm_medium=referral"
 
     @classmethod
+    @lru_cache(maxsize=512)
     def unsplash_user_url(cls, username):
         return f"https://unsplash.com/@{username}?utm_source={config.unsplash.app_name}&utm_medium=referral"
 
+    @classmethod
+    def reset_unsplash_url_cache(cls):
+        """Forget the cached URLs after `config.unsplash.app_name` changes."""
+        cls.unsplash_url.cache_clear()
+        cls.unsplash_user_url.cache_clear()
+
     @classmethod
     def unsplash_credits(cls, user_fullname, username):
         return {
@@ -559,43 +792,88 @@ class Image(db.Entity):
             "site_url": cls.unsplash_url(),
         }
 
-    @staticmethod
-    async def grab_color_async(image_url):
-        async with aiohttp.ClientSession() as client:
-            async with client.get(image_url) as resp:
-                image_file = BytesIO(await resp.read())
-                color = ColorThief(image_file).get_color(quality=1)
-                return f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
+    @classmethod
+    def from_dicts(cls, images):
+        """Get or create the images, looking up the existing ones in a single query."""
+        # The same URL can appear more than once in a payload
+        images = list({image.url: image for image in images}.values())
+        if not images:
+            return []
+
+        urls = [image.url for image in images]
+        existing = {i.url: i for i in select(i for i in Image if i.url in urls)}
+        return [existing.get(image.url) or cls(**image) for image in images]
 
     @staticmethod
-    def grab_color(image_url):
-        resp = requests.get(image_url)
-        image_file = BytesIO(resp.content)
-        color = ColorThief(image_file).get_color(quality=1)
-        return f"#{color[0]:02x}{color[1]:02x}{color[2]:02x}"
+    def get_dominant_color(image_data):
+        image = PILImage.open(BytesIO(image_data))
+        image.thumbnail((100, 100))
+        # Reduce to a small palette in C and take its most used color, like
+        # ColorThief's dominant color without the pure Python median cut
+        palette_image = image.convert("RGB").quantize(
+            colors=DOMINANT_PALETTE_SIZE, method=QUANTIZE_FASTOCTREE
+        )
+        _, index = max(palette_image.getcolors())
+        red, green, blue = palette_image.getpalette()[index * 3 : index * 3 + 3]
+        return "#%02x%02x%02x" % (red, green, blue)
+
+    @classmethod
+    @async_lru(maxsize=4096)
+    async def grab_color_async(cls, image_url):
+        # Failures raise instead of returning a placeholder so that async_lru
+        # doesn't keep them and the next call retries the URL
+        client = await get_http_session()
+        async with client.get(image_url) as resp:
+            resp.raise_for_status()
+            image_data = await resp.read()
+        return await asyncio.get_event_loop().run_in_executor(
+            None, cls.get_dominant_color, image_data
+        )
+
+    @classmethod
+    async def grab_colors_bulk(cls, image_urls, timeout=None):
+        """Grab the colors of many images concurrently, keyed by URL.
+
+        Images whose color couldn't be grabbed within `timeout` seconds map to the
+        exception instead.
+        """
+        image_urls = list(dict.fromkeys(image_urls))
+        colors = await asyncio.gather(
+            *(
+                asyncio.wait_for(cls.grab_color_async(url), timeout)
+                for url in image_urls
+            ),
+            return_exceptions=True,
+        )
+        return dict(zip(image_urls, colors))
+
+    @classmethod
+    @lru_cache(maxsize=4096)
+    def grab_color(cls, image_url):
+        resp = get_requests_session().get(image_url)
+        resp.raise_for_status()
+        return cls.get_dominant_color(resp.content)
 
     @classmethod
     async def download_pg(cls, conn, url):
         unsplash_id = await conn.fetchval(
             "SELECT unsplash_id FROM images WHERE url = $1", url
         )
-        image = None
-        async with aiohttp.ClientSession() as client:
-            async with client.get(url) as resp:
-                _, image = await asyncio.gather(
-                    Unsplash.photo.download(unsplash_id, without_content=True),
-                    resp.read(),
-                )
+        client = await get_http_session()
+        async with client.get(url) as resp:
+            _, image = await asyncio.gather(
+                Unsplash.photo.download(unsplash_id, without_content=True),
+                resp.read(),
+            )
         return image
 
     async def download(self):
-        image = None
-        async with aiohttp.ClientSession() as client:
-            async with client.get(self.url) as resp:
-                _, image = await asyncio.gather(
-                    Unsplash.photo.download(self.unsplash_id, without_content=True),
-                    resp.read(),
-                )
+        client = await get_http_session()
+        async with client.get(self.url) as resp:
+            _, image = await asyncio.gather(
+                Unsplash.photo.download(self.unsplash_id, without_content=True),
+                resp.read(),
+            )
         return image
 
 
@@ -606,15 +884,15 @@ class SpotifyUser(db.Entity):
     user = Optional("User")
     playlists = Set("Playlist")
 
-    @property
+    @cached_property
     def uri(self):
         return f"spotify:user:{self.id}"
 
-    @property
+    @cached_property
     def href(self):
         return f"https://api.spotify.com/v1/users/{self.id}"
 
-    @property
+    @cached_property
     def external_url(self):
         return f"http://open.spotify.com/user/{self.id}"
 
@@ -628,8 +906,18 @@ class Genre(db.Entity, ImageMixin):
     haters = Set(User, reverse="disliked_genres", table="genre_haters")
     images = Set(Image, cascade_delete=True)
 
+    @classmethod
+    def from_names(cls, names):
+        """Get or create the genres, looking up the existing ones in a single query."""
+        names = list(dict.fromkeys(names))
+        if not names:
+            return []
+
+        existing = {g.name: g for g in select(g for g in Genre if g.name in names)}
+        return [existing.get(name) or cls(name=name) for name in names]
+
     def play(self, client, device=None):
-        popularity = random.choice(list(Playlist.Popularity)[:3])
+        popularity = random.choice(Playlist.PLAYABLE_POPULARITIES)
         playlist = client.genre_playlist(self.name, popularity)
         return playlist.play(device=device)
 
@@ -646,46 +934,21 @@ class Country(db.Entity, ImageMixin):
     haters = Set(User, reverse="disliked_countries", table="country_haters")
     images = Set(Image, cascade_delete=True)
 
-    @staticmethod
-    def _name_match(country, name):
-        try:
-            return name in country.name.lower() or name in country.official_name.lower()
-
-        except:
-            return False
-
     @classmethod
     def get_iso_country(cls, country):
+        by_code, by_name, searchable_names = iso_country_index()
         iso_country, code, name = None, None, None
         if len(country) == 2:
             code = country
+            iso_country = by_code.get(code.lower())
         else:
             name = country
-
-        if country == "UK":
-            iso_country = countries.get(alpha_2="GB")
-        elif country == "USA":
-            iso_country = countries.get(alpha_2="US")
-        elif code is not None:
-            try:
-                iso_country = countries.get(alpha_2=code)
-            except KeyError:
-                iso_country = first(
-                    countries, key=lambda c: code.lower() in c.alpha_2.lower()
-                )
-        elif name is not None:
-            try:
-                iso_country = countries.get(name=name)
-            except KeyError:
-                try:
-                    iso_country = countries.get(official_name=name)
-                except KeyError:
-                    try:
-                        iso_country = countries.get(common_name=name)
-                    except KeyError:
-                        iso_country = first(
-                            countries, key=lambda c: cls._name_match(c, name.lower())
-                        )
+            lower_name = name.lower()
+            iso_country = by_name.get(lower_name) or first(
+                c
+                for names, c in searchable_names
+                if any(lower_name in n for n in names)
+            )
         if not iso_country:
             logger.error(
                 "Could not find a country with name=%s and code=%s", name, code
@@ -704,10 +967,7 @@ class Country(db.Entity, ImageMixin):
         )
 
     def get_image_queries(self):
-        words = self.name.split()
-        stems = [[w[:i] for i in range(len(w), 2, -1)] for w in words]
-        queries = [self.name, *words, *sum(stems, [])]
-        return queries
+        return list(image_queries(self.name))
 
 
 class City(db.Entity, ImageMixin):
@@ -720,10 +980,8 @@ class City(db.Entity, ImageMixin):
     images = Set(Image, cascade_delete=True)
 
     def get_image_queries(self):
-        words = self.name.split()
-        stems = [[w[:i] for i in range(len(w), 2, -1)] for w in words]
-        queries = [self.name, self.country.name, *words, *sum(stems, [])]
-        return queries
+        queries = image_queries(self.name)
+        return list(dict.fromkeys([self.name, self.country.name, *queries]))
 
 
 class Playlist(db.Entity, ImageMixin):
@@ -749,6 +1007,16 @@ class Playlist(db.Entity, ImageMixin):
         sound_of_genre=re.compile(f"^The {GENRE_POPULARITY_TITLE} of {GENRE}$"),
         women_filter_genre=re.compile(f"^A ♀Filter for {GENRE}$"),
     )
+    # Literal starts of every pattern except `year_in_genre`, which starts with digits
+    PATTERN_PREFIXES = ("Intro to ", "The ", "Meta", "A ♀Filter for ")
+    # All the patterns as a single alternation, with the group names prefixed by
+    # the pattern name as they would clash otherwise
+    PATTERN = re.compile(
+        "|".join(
+            f"(?P<{name}>{pattern.pattern.replace('(?P<', f'(?P<{name}__')})"
+            for name, pattern in PATTERNS.items()
+        )
+    )
 
     class Popularity(IntEnum):
         SOUND = 0
@@ -761,6 +1029,15 @@ class Playlist(db.Entity, ImageMixin):
         ALL = 7
         INTRO = 8
 
+    # Keyed by the exact spellings the patterns capture (`Sound`, `sound`...)
+    POPULARITY_BY_NAME = {
+        name: member.value
+        for member in Popularity
+        for name in (member.name.lower(), member.name.title())
+    }
+    # Popularities with a playlist for every genre, picked from when playing one
+    PLAYABLE_POPULARITIES = (Popularity.SOUND, Popularity.PULSE, Popularity.EDGE)
+
     id = PrimaryKey(str)  # pylint: disable=redefined-builtin
     collaborative = Required(bool)
     name = Required(str)
@@ -783,46 +1060,65 @@ class Playlist(db.Entity, ImageMixin):
     def play(self, client, device=None):
         return client.start_playback(playlist=self.uri, device=device)
 
-    @property
+    @cached_property
     def uri(self):
         return f"spotify:user:{self.owner.id}:playlist:{self.id}"
 
-    @property
+    @cached_property
     def href(self):
         return f"https://api.spotify.com/v1/users/{self.owner.id}/playlists/{self.id}"
 
-    @property
+    @cached_property
     def external_url(self):
         return f"http://open.spotify.com/user/{self.owner.id}/playlist/{self.id}"
 
     @classmethod
     def get_fields(cls, groups):
+        # Country codes and genres repeat across thousands of playlists so the
+        # interned strings are shared instead of allocated per match
         fields = {}
         if "year" in groups:
             fields["year"] = int(groups["year"])
             fields["date"] = date(fields["year"], 1, 1)
-            fields["popularity"] = cls.Popularity.YEAR.value
+            fields["popularity"] = cls.POPULARITY_BY_NAME["year"]
         if "city" in groups and "country_code" in groups:
-            fields["country"] = groups["country_code"]
+            fields["country"] = sys.intern(groups["country_code"])
             fields["city"] = groups["city"]
-            fields["popularity"] = cls.Popularity.SOUND.value
+            fields["popularity"] = cls.POPULARITY_BY_NAME["sound"]
         if "genre" in groups:
-            genre = groups["genre"].lower()
+            genre = sys.intern(groups["genre"].lower())
             fields["genre"] = genre
             if "christmas" in genre:
                 fields["christmas"] = True
         if "country" in groups:
-            fields["country"] = groups["country"]
+            fields["country"] = sys.intern(groups["country"])
         if groups.get("date"):
-            fields["date"] = datetime.strptime(groups["date"], "%Y%m%d").date()
+            fields["date"] = parse_date(groups["date"])
         if "popularity" in groups:
             popularity = groups["popularity"]
             if popularity:
-                fields["popularity"] = cls.Popularity[popularity.upper()].value
+                fields["popularity"] = cls.POPULARITY_BY_NAME[popularity]
             else:
-                fields["popularity"] = cls.Popularity.ALL.value
+                fields["popularity"] = cls.POPULARITY_BY_NAME["all"]
         return fields
 
+    @classmethod
+    def match_name(cls, name):
+        # Most user playlist names can be rejected without running the regex
+        if not (name.startswith(cls.PATTERN_PREFIXES) or name[:4].isdigit()):
+            return None
+
+        match = cls.PATTERN.match(name)
+        if not match:
+            return None
+
+        prefix = f"{match.lastgroup}__"
+        return {
+            group[len(prefix) :]: value
+            for group, value in match.groupdict().items()
+            if group.startswith(prefix)
+        }
+
     @classmethod
     def from_dict_pg(cls, playlist):
         fields = {
@@ -840,13 +1136,9 @@ class Playlist(db.Entity, ImageMixin):
             ),
             "meta": playlist.name.startswith("Meta"),
         }
-        for pattern in cls.PATTERNS.values():
-            match = pattern.match(playlist.name)
-            if match:
-                groups = match.groupdict()
-                fields.update(cls.get_fields(groups))
-                break
-
+        groups = cls.match_name(playlist.name)
+        if groups is not None:
+            fields.update(cls.get_fields(groups))
         else:
             logger.warning("No pattern matches the playlist: %s", playlist.name)
         return fields
@@ -868,15 +1160,11 @@ class Playlist(db.Entity, ImageMixin):
                 "Pine Needle" in playlist.name or "christmas" in playlist.name.lower()
             ),
             "meta": playlist.name.startswith("Meta"),
-            "images": [Image.get(url=im.url) or Image(**im) for im in playlist.images],
+            "images": Image.from_dicts(playlist.images),
         }
-        for pattern in cls.PATTERNS.values():
-            match = pattern.match(playlist.name)
-            if match:
-                groups = match.groupdict()
-                fields.update(cls.get_fields(groups))
-                break
-
+        groups = cls.match_name(playlist.name)
+        if groups is not None:
+            fields.update(cls.get_fields(groups))
         else:
             logger.warning("No pattern matches the playlist: %s", playlist.name)
 
@@ -908,28 +1196,45 @@ class Artist(db.Entity, ImageMixin):
     def play(self, client, device=None):
         return client.start_playback(artist=self.uri, device=device)
 
-    @property
+    @cached_property
     def uri(self):
         return f"spotify:artist:{self.id}"
 
-    @property
+    @cached_property
     def href(self):
         return f"https://api.spotify.com/v1/artists/{self.id}"
 
-    @property
+    @cached_property
     def external_url(self):
         return f"http://open.spotify.com/artist/{self.id}"
 
     @classmethod
     async def from_dict_async(cls, artist):
-        if artist.images:
-            try:
-                color = await Image.grab_color_async(artist.images[-1].url)
-            except:
+        return (await cls.from_dicts_async([artist]))[0]
+
+    @classmethod
+    async def from_dicts_async(cls, artists):
+        """Create many artists, grabbing their image colors concurrently.
+
+        Artists that already exist are returned as they are.
+        """
+        ids = [a.id for a in artists]
+        existing = {a.id: a for a in select(a for a in Artist if a.id in ids)}
+        missing = list({a.id: a for a in artists if a.id not in existing}.values())
+
+        with_images = [a for a in missing if a.images]
+        colors = await Image.grab_colors_bulk(
+            (a.images[-1].url for a in with_images), timeout=Image.COLOR_TIMEOUT
+        )
+        for artist in with_images:
+            color = colors[artist.images[-1].url]
+            if isinstance(color, BaseException):
                 color = "#000000"
             for image in artist.images:
                 image.color = color
-        return cls.from_dict(artist, grab_image_color=False)
+        for artist in missing:
+            existing[artist.id] = cls.from_dict(artist, grab_image_color=False)
+        return [existing[_id] for _id in ids]
 
     @classmethod
     def from_dict(cls, artist, grab_image_color=True):
@@ -940,8 +1245,8 @@ class Artist(db.Entity, ImageMixin):
                 color = "#000000"
             for image in artist.images:
                 image.color = color
-        genres = [Genre.get(name=genre) or Genre(name=genre) for genre in artist.genres]
-        images = [Image.get(url=image.url) or Image(**image) for image in artist.images]
+        genres = Genre.from_names(artist.genres)
+        images = Image.from_dicts(artist.images)
         return cls(
             id=artist.id,
             name=artist.name,
@@ -958,6 +1263,43 @@ class Artist(db.Entity, ImageMixin):
 class AudioFeatures(db.Entity):
     _table_ = "audio_features"
     KEYS = ["C", "C#", "D", "D#", "E", "F", "F#", "G", "G#", "A", "A#", "B"]
+    COLUMNS = (
+        "id",
+        "acousticness",
+        "danceability",
+        "duration_ms",
+        "energy",
+        "instrumentalness",
+        "key",
+        "liveness",
+        "loudness",
+        "mode",
+        "speechiness",
+        "tempo",
+        "time_signature",
+        "valence",
+    )
+    # Keep a batch under SQLite's default limit of 999 bound parameters
+    INSERT_BATCH_SIZE = 50
+    SELECT_BATCH_SIZE = 500
+    DTYPE = np.dtype(
+        [
+            ("id", "U22"),
+            ("acousticness", "f4"),
+            ("danceability", "f4"),
+            ("duration_ms", "i4"),
+            ("energy", "f4"),
+            ("instrumentalness", "f4"),
+            ("key", "i1"),
+            ("liveness", "f4"),
+            ("loudness", "f4"),
+            ("mode", "?"),
+            ("speechiness", "f4"),
+            ("tempo", "f4"),
+            ("time_signature", "i1"),
+            ("valence", "f4"),
+        ]
+    )
     id = PrimaryKey(str)  # pylint: disable=redefined-builtin
     acousticness = Required(float, min=0.0, max=1.0)
     danceability = Required(float, min=0.0, max=1.0)
@@ -1004,16 +1346,93 @@ class AudioFeatures(db.Entity):
             valence=track["valence"],
         )
 
+    @classmethod
+    def from_dict_many(cls, tracks):
+        """Insert the audio features of many tracks and return their entities.
+
+        Each batch is one multi-row INSERT instead of a flush per entity. Rows that
+        already exist are left untouched. Values are checked against the entity's
+        attribute constraints first, raising ValueError like `from_dict` would.
+        """
+        tracks = list({t["id"]: t for t in tracks if t}.values())
+        columns = ", ".join(cls.COLUMNS)
+        attributes = [getattr(cls, column) for column in cls.COLUMNS]
+        for i in range(0, len(tracks), cls.INSERT_BATCH_SIZE):
+            params = {}
+            rows = []
+            for j, track in enumerate(tracks[i : i + cls.INSERT_BATCH_SIZE]):
+                for column, attr in zip(cls.COLUMNS, attributes):
+                    value = track[column]
+                    if column == "mode":
+                        value = bool(value)
+                    # The raw INSERT bypasses Pony's min/max validation
+                    params[f"{column}_{j}"] = attr.validate(value)
+                rows.append(
+                    "(" + ", ".join(f"${column}_{j}" for column in cls.COLUMNS) + ")"
+                )
+            db.execute(
+                f"INSERT INTO {cls._table_} ({columns}) VALUES {', '.join(rows)} "
+                "ON CONFLICT DO NOTHING",
+                params,
+            )
+
+        ids = [t["id"] for t in tracks]
+        features = []
+        for i in range(0, len(ids), cls.SELECT_BATCH_SIZE):
+            batch = ids[i : i + cls.SELECT_BATCH_SIZE]
+            features.extend(select(a for a in cls if a.id in batch))
+        return features
 
-if config.database.connection.filename:
-    config.database.connection.filename = os.path.expandvars(
-        config.database.connection.filename
-    )
-db.bind(**config.database.connection)
-
-GENERATE_MAPPING = os.getenv("SPFY_GENERATE_MAPPING")
-if GENERATE_MAPPING not in {"false", "0", "off", "f", "no"} and (
-    config.database.generate_mapping
-    or GENERATE_MAPPING in {"true", "1", "on", "t", "yes"}
-):
-    db.generate_mapping(create_tables=True)
+    @classmethod
+    def as_ndarray(cls, ids=None):
+        """Load audio features into a structured array with one record per track.
+
+        Aggregates can then work on whole columns, e.g. `features["energy"].mean()`,
+        without creating an entity per row.
+        """
+        sql = f"SELECT {', '.join(cls.DTYPE.names)} FROM {cls._table_}"
+        if ids is None:
+            rows = db.select(sql)
+        else:
+            ids = list(ids)
+            rows = []
+            for i in range(0, len(ids), cls.SELECT_BATCH_SIZE):
+                batch = ids[i : i + cls.SELECT_BATCH_SIZE]
+                params = {f"id_{j}": _id for j, _id in enumerate(batch)}
+                placeholders = ", ".join(f"${name}" for name in params)
+                rows.extend(db.select(f"{sql} WHERE id IN ({placeholders})", params))
+        return np.array([tuple(row) for row in rows], dtype=cls.DTYPE)
+
+
+_bound = False
+
+
+def init_db():
+    """Bind the database and generate the mapping on first use.
+
+    Set `SPFY_LAZY_DB=1` to skip this at import time, e.g. when only the entity
+    classes are needed. The Spotify clients call it when they are created.
+    """
+    global _bound  # pylint: disable=global-statement
+    if _bound:
+        return
+
+    # A failed attempt may have bound the database before the mapping failed
+    if db.provider is None:
+        if config.database.connection.filename:
+            config.database.connection.filename = os.path.expanduser(
+                os.path.expandvars(config.database.connection.filename)
+            )
+        db.bind(**config.database.connection)
+
+    generate_mapping = os.getenv("SPFY_GENERATE_MAPPING")
+    if generate_mapping not in {"false", "0", "off", "f", "no"} and (
+        config.database.generate_mapping
+        or generate_mapping in {"true", "1", "on", "t", "yes"}
+    ):
+        db.generate_mapping(create_tables=True)
+    _bound = True
+
+
+if os.getenv("SPFY_LAZY_DB") not in {"true", "1", "on", "t", "yes"}:
+    init_db()
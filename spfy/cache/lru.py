@@ -0,0 +1,102 @@
+import asyncio
+
+import functools
+import inspect
+import time
+from collections import namedtuple
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+# Cache entries are [future, expiry time, number of callers awaiting the future]
+FUTURE, EXPIRES, WAITERS = range(3)
+
+
+def _evict_failed(cache, key, entry, future):
+    # Failed, cancelled and empty (None) results are retried on the next call
+    # instead of being served from the cache
+    failed = future.cancelled() or future.exception() or future.result() is None
+    if failed and cache.get(key) is entry:
+        del cache[key]
+
+
+def async_lru(maxsize=100, ttl=None):
+    """Memoize a coroutine function, or method, with a bounded LRU cache.
+
+    `maxsize` and `ttl` (seconds) should be sized per call site: check the
+    ratio of hits to misses in `cache_info()` under real usage and grow the
+    cache only where it actually improves.
+
+    Exceptions, cancellations and `None` results are not cached.
+    """
+
+    def decorator(fn):
+        params = inspect.signature(fn).parameters
+        is_method = next(iter(params), None) == "self"
+        cache_attr = f"_async_lru_{fn.__name__}"
+        function_cache = {}
+        hits = misses = 0
+
+        @functools.wraps(fn)
+        async def memoizer(*args, **kwargs):
+            nonlocal hits, misses
+            try:
+                key = functools._make_key(
+                    args[1:] if is_method else args, kwargs, typed=False
+                )
+            except TypeError:
+                # Unhashable arguments (e.g. API result dicts) can't be cached
+                return await fn(*args, **kwargs)
+
+            if is_method:
+                # Methods keep their cache on the instance so `self` stays out
+                # of the key and the entries are freed together with it
+                cache = vars(args[0]).setdefault(cache_attr, {})
+            else:
+                cache = function_cache
+
+            now = time.monotonic()
+            entry = cache.get(key)
+            expires = entry[EXPIRES] if entry is not None else None
+            if expires is not None and now > expires:
+                del cache[key]
+                entry = None
+
+            if entry is not None:
+                hits += 1
+                cache[key] = cache.pop(key)
+                future = entry[FUTURE]
+            else:
+                misses += 1
+                if len(cache) >= maxsize:
+                    del cache[next(iter(cache))]
+                # Cache the future before awaiting so concurrent identical
+                # calls share a single request instead of racing each other
+                future = asyncio.ensure_future(fn(*args, **kwargs))
+                entry = cache[key] = [future, now + ttl if ttl else None, 0]
+                future.add_done_callback(
+                    functools.partial(_evict_failed, cache, key, entry)
+                )
+            # Shielded so a cancelled caller doesn't cancel the call for the
+            # others waiting on it, but the last one to leave cancels it
+            entry[WAITERS] += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if entry[WAITERS] == 1 and not future.done():
+                    future.cancel()
+                raise
+            finally:
+                entry[WAITERS] -= 1
+
+        def cache_info(instance=None):
+            """Report cache statistics; methods need `instance` for `currsize`."""
+            if is_method:
+                currsize = len(vars(instance).get(cache_attr, ())) if instance else 0
+            else:
+                currsize = len(function_cache)
+            return CacheInfo(hits, misses, maxsize, currsize)
+
+        memoizer.cache_info = cache_info
+        return memoizer
+
+    return decorator
@@ -3,19 +3,19 @@
 import ujson as json
 from datetime import datetime
 from first import first
-from functools import lru_cache, partialmethod
+from functools import lru_cache
 from itertools import chain
 from operator import attrgetter
 from time import sleep
 
 from . import logger
-from .cache import AudioFeatures, Playlist, db, db_session, select
+from .cache import AudioFeatures, Playlist, db, db_session, init_db, select
 from .constants import (
     API,
     DEVICE_ID_RE,
     MANELISTI,
     PLAYLIST_URI_RE,
-    AudioFeature,
+    RECOMMENDATION_PARAMS,
     TimeRange,
 )
 from .exceptions import (
@@ -37,6 +37,7 @@ class SpotifyClient(AuthMixin, EmailMixin):
         :param proxies: Definition of proxies
         :param requests_timeout: Tell Requests to stop waiting for a response after a given number of seconds
         """
+        init_db()
         super().__init__(*args, **kwargs)
         self.proxies = proxies
         self.requests_timeout = requests_timeout
@@ -609,6 +610,9 @@ class SpotifyClient(AuthMixin, EmailMixin):
             - snapshot_id - optional id of the playlist snapshot
 
         """
+        if not tracks:
+            return None
+
         _id = self._get_playlist_id(playlist_id)
         track_uris = map(self._get_track_uri, tracks)
         payload = {"tracks": [{"uri": track} for track in track_uris]}
@@ -637,6 +641,9 @@ class SpotifyClient(AuthMixin, EmailMixin):
                     ]
             - snapshot_id - optional id of the playlist snapshot
         """
+        if not tracks:
+            return None
+
         _id = self._get_playlist_id(playlist_id)
         ftracks = []
         for tr in tracks:
@@ -736,8 +743,11 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - ids - a list of artist IDs
         """
+        if not ids:
+            return None
+
         return self._put(
-            API.MY_FOLLOWING.value, type="artist", ids=",".join(ids or []), **kwargs
+            API.MY_FOLLOWING.value, type="artist", ids=",".join(ids), **kwargs
         )
 
     def user_follow_users(self, ids=None, **kwargs):
@@ -745,8 +755,11 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - ids - a list of user IDs
         """
+        if not ids:
+            return None
+
         return self._put(
-            API.MY_FOLLOWING.value, type="user", ids=",".join(ids or []), **kwargs
+            API.MY_FOLLOWING.value, type="user", ids=",".join(ids), **kwargs
         )
 
     def current_user_saved_tracks_delete(self, tracks=None, **kwargs):
@@ -756,9 +769,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - tracks - a list of track URIs, URLs or IDs
         """
-        track_list = []
-        if tracks is not None:
-            track_list = map(self._get_track_id, tracks)
+        if not tracks:
+            return None
+
+        track_list = map(self._get_track_id, tracks)
         return self._delete(API.MY_TRACKS.value, ids=",".join(track_list), **kwargs)
 
     def current_user_saved_tracks_contains(self, tracks=None, **kwargs):
@@ -768,9 +782,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - tracks - a list of track URIs, URLs or IDs
         """
-        track_list = []
-        if tracks is not None:
-            track_list = map(self._get_track_id, tracks)
+        if not tracks:
+            return []
+
+        track_list = map(self._get_track_id, tracks)
         return self._get(API.MY_TRACKS_CONTAINS.value, ",".join(track_list), **kwargs)
 
     def current_user_saved_tracks_add(self, tracks=None, **kwargs):
@@ -780,9 +795,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - tracks - a list of track URIs, URLs or IDs
         """
-        track_list = []
-        if tracks is not None:
-            track_list = map(self._get_track_id, tracks)
+        if not tracks:
+            return None
+
+        track_list = map(self._get_track_id, tracks)
         return self._put(API.MY_TRACKS.value, ids=",".join(track_list), **kwargs)
 
     def current_user_top_artists(
@@ -829,7 +845,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
         Parameters:
             - albums - a list of album URIs, URLs or IDs
         """
-        album_list = map(self._get_album_id, albums or [])
+        if not albums:
+            return None
+
+        album_list = map(self._get_album_id, albums)
         return self._put(API.MY_ALBUMS.value, ids=",".join(album_list), **kwargs)
 
     def featured_playlists(
@@ -978,11 +997,8 @@ class SpotifyClient(AuthMixin, EmailMixin):
             params["seed_tracks"] = ",".join(map(self._get_track_id, seed_tracks))
         if country:
             params["market"] = country
-        for attribute in list(AudioFeature):
-            for prefix in ["min_", "max_", "target_"]:
-                param = prefix + attribute.value
-                if param in kwargs:
-                    params[param] = kwargs.pop(param)
+        for param in RECOMMENDATION_PARAMS & kwargs.keys():
+            params[param] = kwargs.pop(param)
 
         if not filter_manele:
             return self._get(API.RECOMMENDATIONS.value, **params, **kwargs)
@@ -1037,9 +1053,10 @@ class SpotifyClient(AuthMixin, EmailMixin):
             for t in batches
         ]
         with db_session:
-            audio_features = [
-                AudioFeatures.from_dict(t) for t in chain.from_iterable(audio_features)
-            ] + cached_tracks
+            audio_features = (
+                AudioFeatures.from_dict_many(chain.from_iterable(audio_features))
+                + cached_tracks
+            )
         return audio_features
 
     def devices(self, **kwargs):
@@ -1292,13 +1309,20 @@ class SpotifyClient(AuthMixin, EmailMixin):
 
         return result
 
-    _get_track_id = partialmethod(_get_id, "track")
-    _get_artist_id = partialmethod(_get_id, "artist")
-    _get_album_id = partialmethod(_get_id, "album")
-    _get_playlist_id = partialmethod(_get_id, "playlist")
+    def _get_track_id(self, result):
+        return self._get_id("track", result)
+
+    def _get_artist_id(self, result):
+        return self._get_id("artist", result)
+
+    def _get_album_id(self, result):
+        return self._get_id("album", result)
+
+    def _get_playlist_id(self, result):
+        return self._get_id("playlist", result)
 
     def _get_uri(self, _type, result):
-        return "spotify:" + _type + ":" + self._get_id(_type, result)
+        return f"spotify:{_type}:{self._get_id(_type, result)}"
 
     def _get_playlist_uri(self, playlist, user=None):
         if isinstance(playlist, (str, bytes)) and PLAYLIST_URI_RE.match(playlist):
@@ -1319,6 +1343,11 @@ class SpotifyClient(AuthMixin, EmailMixin):
 
         return None
 
-    _get_track_uri = partialmethod(_get_uri, "track")
-    _get_artist_uri = partialmethod(_get_uri, "artist")
-    _get_album_uri = partialmethod(_get_uri, "album")
+    def _get_track_uri(self, result):
+        return self._get_uri("track", result)
+
+    def _get_artist_uri(self, result):
+        return self._get_uri("artist", result)
+
+    def _get_album_uri(self, result):
+        return self._get_uri("album", result)
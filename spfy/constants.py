@@ -150,6 +150,11 @@ class API(Enum):
 VOLUME_FADE_SECONDS = 5 * 60
 DEVICE_ID_RE = re.compile(r"[a-zA-Z0-9]{40}")
 PLAYLIST_URI_RE = re.compile(r"spotify:user:[^:]+:playlist:[^:]+")
+RECOMMENDATION_PARAMS = frozenset(
+    f"{prefix}{attribute.value}"
+    for attribute in AudioFeature
+    for prefix in ("min_", "max_", "target_")
+)
 MANELISTI = {
     "2Ieszafc1unlRGyRmhGDFB",
     "2JoWWy2bVRC2bcx67BwILT",
@@ -7,13 +7,12 @@ import socket
 import threading
 import uuid
 from aiohttp.web_runner import GracefulExit
-from datetime import datetime
 from oauthlib.oauth2 import BackendApplicationClient
 from pathlib import Path
 from pony.orm import db_session, get, select
 
 from ... import config, logger, root
-from ...cache import Country, User
+from ...cache import Country, User, parse_date
 from ...constants import API, AllScopes, AuthFlow
 from ...exceptions import SpotifyCredentialsException
 from ...sql import SQL
@@ -22,6 +21,9 @@ from .aiohttp_oauthlib import OAuth2Session
 AUTH_HTML_FILE = root / "html" / "auth_message.html"
 CACHE_FILE = Path.home() / ".cache" / "spfy" / ".web_cache"
 web_app = aiohttp.web.Application()
+connector = None
+# aiohttp connectors are bound to the loop they were created on
+connector_loop = None
 
 
 def run_app(loop):
@@ -31,6 +33,30 @@ def run_app(loop):
     )
 
 
+def get_connector():
+    """Connection pool shared by all sessions so TLS connections get reused."""
+    global connector, connector_loop  # pylint: disable=global-statement
+    loop = asyncio.get_running_loop()
+    if connector is None or connector.closed or connector_loop is not loop:
+        connector = aiohttp.TCPConnector(
+            limit=config.http.concurrent_connections,
+            limit_per_host=config.http.parallel_connections,
+            ttl_dns_cache=300,
+            keepalive_timeout=60,
+        )
+        connector_loop = loop
+    return connector
+
+
+async def close_connector():
+    if (
+        connector is not None
+        and not connector.closed
+        and connector_loop is asyncio.get_running_loop()
+    ):
+        await connector.close()
+
+
 class AuthMixin:
     def __init__(
         self,
@@ -130,6 +156,8 @@ class AuthMixin:
             redirect_uri=self.redirect_uri,
             scope=scope,
             auto_refresh_url=API.TOKEN.value,
+            connector=get_connector(),
+            connector_owner=False,
         )
         if self.user_id:
             user = await self.fetch_user()
@@ -161,7 +189,7 @@ class AuthMixin:
 
             user_details = await self.current_user()
             if user_details.birthdate:
-                birthdate = datetime.strptime(user_details.birthdate, "%Y-%m-%d")
+                birthdate = parse_date(user_details.birthdate)
             else:
                 birthdate = None
 
@@ -230,7 +258,11 @@ class AuthMixin:
 
         self.user_id = default_user.id
         self.username = default_user.username
-        self.session = OAuth2Session(client=BackendApplicationClient(self.client_id))
+        self.session = OAuth2Session(
+            client=BackendApplicationClient(self.client_id),
+            connector=get_connector(),
+            connector_owner=False,
+        )
         self.session.token_updater = self.update_user_token
         if default_user.token:
             self.session.token = default_user.token
@@ -257,6 +289,8 @@ class AuthMixin:
             redirect_uri=self.redirect_uri,
             scope=scope,
             auto_refresh_url=API.TOKEN.value,
+            connector=get_connector(),
+            connector_owner=False,
         )
         with db_session:
             if self.user_id:
@@ -324,7 +358,11 @@ class AuthMixin:
         default_user = User.default()
         self.user_id = default_user.id
         self.username = default_user.username
-        self.session = OAuth2Session(client=BackendApplicationClient(self.client_id))
+        self.session = OAuth2Session(
+            client=BackendApplicationClient(self.client_id),
+            connector=get_connector(),
+            connector_owner=False,
+        )
         self.session.token_updater = User.token_updater(default_user.id)
         if default_user.token:
             self.session.token = default_user.token
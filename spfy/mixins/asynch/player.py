@@ -1,11 +1,11 @@
 import asyncio
+
 import random
 import sys
-from collections import OrderedDict
-from functools import partial
-
 from cached_property import cached_property
+from collections import OrderedDict
 from first import first
+from functools import partial
 
 from ... import config
 from ...cache import Playlist, db_session
@@ -210,7 +210,7 @@ class PlayerMixin:
         fade_args = kwargs.get("fade_args") or {
             k[5:]: v for k, v in kwargs.items() if k.startswith("fade_")
         }
-        popularity = random.choice(list(Playlist.Popularity)[:3])
+        popularity = random.choice(Playlist.PLAYABLE_POPULARITIES)
         top_genres = await self.top_genres(time_range=time_range)
         genre = top_genres.select().without_distinct().random(1)[0]
         playlist = self.genre_playlist(genre.name, popularity)
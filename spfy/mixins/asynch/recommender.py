@@ -1,14 +1,13 @@
 import asyncio
+from typing import Iterator
+
 import random
 import time
 from collections import defaultdict
 from datetime import date, datetime, timedelta
 from functools import partial
 from itertools import chain
-from typing import Iterator
-
 from pony.orm import db_session, get, select
-from pony.orm.core import CacheIndexError
 from unsplash.errors import UnsplashConnectionError, UnsplashError
 
 from ... import logger
@@ -18,6 +17,9 @@ from ...constants import TimeRange
 from ...sql import SQL
 from ...util import normalize_features
 
+IMAGE_UPSERT_BATCH_SIZE = 50
+PLAYLIST_BATCH_SIZE = 50
+
 
 class RecommenderMixin:
     USER_LIST = ("particledetector", "thesoundsofspotify")
@@ -152,6 +154,7 @@ class RecommenderMixin:
         else:
             reqs_iterator = reqs
 
+        pending = []
         try:
             async for resp in limited_as_completed(
                 reqs_iterator,
@@ -161,10 +164,10 @@ class RecommenderMixin:
                 if not resp:
                     continue
 
-                image_fields, updated_fields = resp
-                await ImageMixin.upsert_unsplash_image(
-                    conn, image_fields, **updated_fields
-                )
+                pending.append(resp)
+                if len(pending) >= IMAGE_UPSERT_BATCH_SIZE:
+                    await ImageMixin.upsert_unsplash_images(conn, pending)
+                    pending = []
         except LimitedAsCompletedError as exc:
             for future in exc.remaining_futures:
                 future.cancel()
@@ -192,6 +195,9 @@ class RecommenderMixin:
                 )
             )
 
+        if pending:
+            await ImageMixin.upsert_unsplash_images(conn, pending)
+
     # pylint: disable=too-many-locals
     async def fetch_playlists_pg(self, conn=None):
         conn = conn or await self.dbpool
@@ -249,6 +255,8 @@ class RecommenderMixin:
     async def fetch_playlists(self):
         with db_session:
             fetched_ids = set(select(p.id for p in Playlist))
+
+        new_playlists = []
         for user in self.USER_LIST:
             user_playlists = await self.user_playlists(user)
             async for playlist in user_playlists.iterall(ignore_exceptions=True):
@@ -257,9 +265,34 @@ class RecommenderMixin:
 
                 logger.info("Got %s", playlist.name)
                 if playlist.id not in fetched_ids:
+                    new_playlists.append(playlist)
+                    if len(new_playlists) >= PLAYLIST_BATCH_SIZE:
+                        self.store_playlists(new_playlists)
+                        new_playlists = []
+                fetched_ids.add(playlist.id)
+        self.store_playlists(new_playlists)
+
+    @staticmethod
+    def store_playlists(playlists):
+        """Commit a batch of playlists in one transaction.
+
+        If the batch fails, its playlists are stored one by one so only the bad
+        ones are skipped.
+        """
+        if not playlists:
+            return
+
+        try:
+            with db_session:
+                for playlist in playlists:
+                    Playlist.from_dict(playlist)
+        except Exception:
+            for playlist in playlists:
+                try:
                     with db_session:
                         Playlist.from_dict(playlist)
-                fetched_ids.add(playlist.id)
+                except Exception as exc:
+                    logger.exception("Skipping playlist %s: %s", playlist.id, exc)
 
     async def fetch_user_top(self, time_range):
         with db_session:
@@ -267,18 +300,12 @@ class RecommenderMixin:
             top_artists = await self.current_user_top_artists(
                 limit=50, time_range=time_range
             )
-            async for artist in top_artists.iterall():
-                if self.is_disliked_artist(artist):
-                    continue
-
-                if Artist.exists(id=artist.id):
-                    self.user.top_artists.add(Artist[artist.id])
-                else:
-                    try:
-                        artist = await Artist.from_dict_async(artist)
-                    except CacheIndexError:
-                        artist = Artist[artist.id]
-                    self.user.top_artists.add(artist)
+            artists = [
+                artist
+                async for artist in top_artists.iterall()
+                if not self.is_disliked_artist(artist)
+            ]
+            self.user.top_artists.add(await Artist.from_dicts_async(artists))
             self.user.top_genres = (
                 self.user.top_artists.genres.distinct().keys()
                 - self.user.disliked_genres
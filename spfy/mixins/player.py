@@ -1,9 +1,8 @@
 import random
 import sys
 import threading
-from collections import OrderedDict
-
 from cached_property import cached_property
+from collections import OrderedDict
 from first import first
 
 from .. import config
@@ -183,7 +182,7 @@ class PlayerMixin:
         fade_args = kwargs.get("fade_args") or {
             k[5:]: v for k, v in kwargs.items() if k.startswith("fade_")
         }
-        popularity = random.choice(list(Playlist.Popularity)[:3])
+        popularity = random.choice(Playlist.PLAYABLE_POPULARITIES)
         genre = (
             self.top_genres(time_range=time_range)
             .select()
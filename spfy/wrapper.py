@@ -7,6 +7,9 @@ from .client import SpotifyClient
 from .constants import AuthFlow
 from .mixins import PlayerMixin, RecommenderMixin
 
+_DEFAULT_EMAIL = config.auth.email
+_DEFAULT_USERNAME = config.auth.username
+
 
 class Spotify(SpotifyClient, PlayerMixin, RecommenderMixin):
     """Spotify high-level wrapper."""
@@ -15,26 +18,35 @@ class Spotify(SpotifyClient, PlayerMixin, RecommenderMixin):
 
     def __init__(self, *args, email=None, username=None, **kwargs):
         super().__init__(*args, **kwargs)
-        self.email = email or config.auth.email
-        self.username = username or config.auth.username
+        self.email = email or _DEFAULT_EMAIL
+        self.username = username or _DEFAULT_USERNAME
 
-    def auth(
-        self, email=config.auth.email, username=config.auth.username, server=False
-    ):
+    def auth(self, email=None, username=None, server=False):
         if self.cli and not self.is_authenticated:
             if server:
                 self.authenticate(flow=AuthFlow.CLIENT_CREDENTIALS)
             else:
                 try:
-                    self.authenticate(email=email, username=username)
+                    self.authenticate(
+                        email=email or _DEFAULT_EMAIL,
+                        username=username or _DEFAULT_USERNAME,
+                    )
                 except Exception as exc:
                     logger.exception(exc)
         return self
 
     def __dir__(self):
-        names = super().__dir__()
-        names = [name for name in names if not name.startswith("_") and name != "user"]
-        return names
+        cls = type(self)
+        if "_public_names" not in vars(cls):
+            # fire calls dir() repeatedly while introspecting the CLI and the
+            # names coming from the class hierarchy never change
+            cls._public_names = tuple(
+                name for name in dir(cls) if not name.startswith("_") and name != "user"
+            )
+        instance_names = (
+            name for name in vars(self) if not name.startswith("_") and name != "user"
+        )
+        return list(dict.fromkeys([*cls._public_names, *instance_names]))
 
 
 def main():
@@ -0,0 +1,6 @@
+import os
+
+
+def pytest_configure(config):  # pylint: disable=unused-argument
+    # Keep importing spfy from binding the configured database, the tests use sqlite
+    os.environ["SPFY_LAZY_DB"] = "1"
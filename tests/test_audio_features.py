@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pony")
+
+from spfy.asynch.client import SpotifyClient  # isort:skip
+from spfy.asynch.result import SpotifyResult  # isort:skip
+from spfy.cache import AudioFeatures, db, db_session  # isort:skip
+
+
+def audio_features(_id, **fields):
+    return {
+        "id": _id,
+        "acousticness": 0.1,
+        "danceability": 0.5,
+        "duration_ms": 200_000,
+        "energy": 0.8,
+        "instrumentalness": 0.0,
+        "key": 5,
+        "liveness": 0.2,
+        "loudness": -6.0,
+        "mode": 1,
+        "speechiness": 0.05,
+        "tempo": 120.0,
+        "time_signature": 4,
+        "valence": 0.6,
+        **fields,
+    }
+
+
+@pytest.fixture(scope="module", autouse=True)
+def database():
+    if db.provider is None:
+        db.bind(provider="sqlite", filename=":memory:")
+        db.generate_mapping(create_tables=True)
+    return db
+
+
+def test_from_dict_many_inserts_new_tracks():
+    tracks = [audio_features("many1"), audio_features("many2"), None]
+    with db_session:
+        features = AudioFeatures.from_dict_many(tracks)
+        assert sorted(f.id for f in features) == ["many1", "many2"]
+        assert AudioFeatures["many1"].mode is True
+
+
+def test_from_dict_many_skips_duplicates_and_existing_rows():
+    with db_session:
+        AudioFeatures.from_dict(audio_features("existing", energy=0.3))
+
+    tracks = [
+        audio_features("existing", energy=0.9),
+        audio_features("dup"),
+        audio_features("dup"),
+    ]
+    with db_session:
+        features = AudioFeatures.from_dict_many(tracks)
+        assert sorted(f.id for f in features) == ["dup", "existing"]
+        assert AudioFeatures["existing"].energy == 0.3
+
+
+def test_from_dict_many_selects_in_batches(monkeypatch):
+    monkeypatch.setattr(AudioFeatures, "INSERT_BATCH_SIZE", 2)
+    monkeypatch.setattr(AudioFeatures, "SELECT_BATCH_SIZE", 2)
+    tracks = [audio_features(f"batch{i}") for i in range(5)]
+    with db_session:
+        features = AudioFeatures.from_dict_many(tracks)
+        assert isinstance(features, list)
+        assert sorted(f.id for f in features) == [f"batch{i}" for i in range(5)]
+
+
+def test_from_dict_many_validates_ranges():
+    with db_session:
+        with pytest.raises(ValueError):
+            AudioFeatures.from_dict_many([audio_features("invalid", energy=1.5)])
+        assert not AudioFeatures.exists(id="invalid")
+
+
+def test_as_ndarray():
+    with db_session:
+        AudioFeatures.from_dict_many(
+            [audio_features("array1", energy=0.2), audio_features("array2", energy=0.4)]
+        )
+        features = AudioFeatures.as_ndarray(["array1", "array2", "missing"])
+        everything = AudioFeatures.as_ndarray()
+
+    assert sorted(features["id"]) == ["array1", "array2"]
+    assert features["energy"].mean() == pytest.approx(0.3)
+    assert features["mode"].all()
+    assert {"array1", "array2"} <= set(everything["id"])
+
+
+class FakeClient:
+    """Answers the audio features endpoint without going through the network."""
+
+    def __init__(self):
+        self.requested = []
+
+    @staticmethod
+    def _get_track_id(track):
+        return track
+
+    async def _get(self, url, ids=None, **kwargs):  # pylint: disable=unused-argument
+        ids = ids.split(",")
+        self.requested.extend(ids)
+        return SpotifyResult(audio_features=[audio_features(_id) for _id in ids])
+
+
+def test_async_audio_features_merges_cached_rows():
+    with db_session:
+        AudioFeatures.from_dict(audio_features("cached", energy=0.3))
+
+    client = FakeClient()
+    features = asyncio.run(
+        SpotifyClient.audio_features(
+            client, tracks=["cached", "fetched1", "fetched2"], with_cache=True
+        )
+    )
+
+    assert sorted(client.requested) == ["fetched1", "fetched2"]
+    with db_session:
+        assert sorted(f.id for f in features) == ["cached", "fetched1", "fetched2"]
+        assert AudioFeatures["fetched1"].energy == 0.8
@@ -0,0 +1,60 @@
+import pytest
+
+pytest.importorskip("pony")
+
+from spfy.asynch.wrapper import negate_flags, parse_commands  # isort:skip
+
+
+def test_parse_single_command():
+    assert parse_commands(["devices"]) == [("devices", [], {})]
+
+
+def test_parse_positional_values():
+    assert parse_commands(["volume", "50", "spotify:track:1"]) == [
+        ("volume", [50, "spotify:track:1"], {})
+    ]
+
+
+def test_parse_keyword_values():
+    assert parse_commands(["play", "--device=kitchen", "--offset", "3"]) == [
+        ("play", [], {"device": "kitchen", "offset": 3})
+    ]
+
+
+def test_parse_bare_flags():
+    assert parse_commands(["auth", "--server", "--dry-run"]) == [
+        ("auth", [], {"server": True, "dry_run": True})
+    ]
+
+
+def test_parse_chained_commands():
+    assert parse_commands(["-", "auth", "--server", "-", "top-artists", "10"]) == [
+        ("auth", [], {"server": True}),
+        ("top_artists", [10], {}),
+    ]
+
+
+def test_parse_no_commands():
+    assert parse_commands([]) == []
+    assert parse_commands(["-"]) == []
+
+
+def test_negate_flags():
+    def play(device=None, notify=True):  # pylint: disable=unused-argument
+        pass
+
+    assert negate_flags(play, {"nodevice": True}) == {"device": False}
+    # Arguments that really start with "no" are left alone
+    assert negate_flags(play, {"notify": True}) == {"notify": True}
+    # Only bare flags are negated
+    assert negate_flags(play, {"nodevice": "x"}) == {"nodevice": "x"}
+    assert negate_flags(play, {"noshuffle": True}) == {"noshuffle": True}
+
+
+def test_parse_negated_flag():
+    def next_track(device=None):  # pylint: disable=unused-argument
+        pass
+
+    [(name, args, kwargs)] = parse_commands(["next-track", "--nodevice"])
+    assert name == "next_track"
+    assert negate_flags(next_track, kwargs) == {"device": False}
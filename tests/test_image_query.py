@@ -0,0 +1,19 @@
+import pytest
+
+pytest.importorskip("pony")
+
+from spfy.cache.db import image_query  # isort:skip
+
+
+def test_image_query_binds_fields_from_first_placeholder():
+    assert image_query(("playlist_id", "unsplash_id")) == (
+        "SELECT * FROM images WHERE playlist_id = $1 AND unsplash_id = $2 "
+        "ORDER BY width DESC LIMIT 1"
+    )
+
+
+def test_image_query_binds_fields_after_the_dimension():
+    assert image_query(("artist_id",), "height") == (
+        "SELECT * FROM images WHERE height >= $1 AND artist_id = $2 "
+        "ORDER BY height LIMIT 1"
+    )